@@ -4,186 +4,312 @@ FPGA Verification Tools
 Generates BRAM initialization files for hardware-in-the-loop verification
 """
 
+import os
 import sys
+import struct
 import argparse
-from typing import List, Tuple, Dict
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import List, Tuple, Dict, Iterable, Iterator
+
+# funct3/funct7 fields per mnemonic
+_BRANCH_FUNCT3 = {'beq': 0b000, 'bne': 0b001, 'blt': 0b100, 'bge': 0b101}
+_RTYPE_FUNCT3 = {'add': 0b000, 'sub': 0b000, 'and': 0b111,
+                 'or': 0b110, 'xor': 0b100}
+_RTYPE_FUNCT7 = {'add': 0b0000000, 'sub': 0b0100000, 'and': 0b0000000,
+                 'or': 0b0000000, 'xor': 0b0000000}
+_ITYPE_FUNCT3 = {'addi': 0b000, 'andi': 0b111, 'ori': 0b110, 'xori': 0b100}
+
+# Opcode dispatch: mnemonic -> (format, fixed fields). For 'CONST' the
+# second item is the finished instruction word. Unknown mnemonics assemble
+# to a NOP.
+_NOP = 0x00000013  # ADDI x0, x0, 0
+_ENCODERS = {
+    **{op: ('B', (funct3,)) for op, funct3 in _BRANCH_FUNCT3.items()},
+    **{op: ('R', (funct3, _RTYPE_FUNCT7[op])) for op, funct3 in _RTYPE_FUNCT3.items()},
+    **{op: ('I', (funct3,)) for op, funct3 in _ITYPE_FUNCT3.items()},
+    'jal': ('J', (0x6F,)),
+    'jalr': ('J', (0x67,)),
+    'nop': ('CONST', _NOP),
+}
+
+# Register names to numbers: x0-x31 plus the common ABI names
+_REG_MAP = {f'x{i}': i for i in range(32)}
+_REG_MAP.update({
+    'zero': 0, 'ra': 1, 'sp': 2, 'gp': 3, 'tp': 4,
+    't0': 5, 't1': 6, 't2': 7, 's0': 8, 'fp': 8,
+    's1': 9, 'a0': 10, 'a1': 11, 'a2': 12, 'a3': 13,
+    'a4': 14, 'a5': 15, 'a6': 16, 'a7': 17,
+    's2': 18, 's3': 19, 's4': 20, 's5': 21,
+    's6': 22, 's7': 23, 's8': 24, 's9': 25,
+    's10': 26, 's11': 27, 't3': 28, 't4': 29,
+    't5': 30, 't6': 31
+})
+
+# ============================================================================
+# Instruction Encoders
+# ============================================================================
+# Pure integer bit packing: operands are already resolved to register
+# numbers, funct fields and offsets, so nothing here touches strings.
+
+def _enc_branch(funct3: int, rs1: int, rs2: int, offset: int) -> int:
+    """Pack a B-type instruction"""
+    imm12 = offset & 0x1000
+    imm10_5 = (offset & 0x7E0) << 20
+    imm4_1 = (offset & 0x1E) << 7
+    imm11 = (offset & 0x800) >> 4
+
+    return 0x63 | (funct3 << 12) | (rs1 << 15) | (rs2 << 20) | imm4_1 | imm11 | imm10_5 | imm12
+
+
+def _enc_jal(rd: int, offset: int) -> int:
+    """Pack a JAL instruction"""
+    return 0x6F | (rd << 7) | (offset & 0xFFFFF000)
+
+
+def _enc_jalr(rd: int, rs1: int, offset: int) -> int:
+    """Pack a JALR instruction"""
+    return 0x67 | (rd << 7) | (0 << 12) | (rs1 << 15) | ((offset & 0xFFF) << 20)
+
+
+def _enc_rtype(funct3: int, funct7: int, rd: int, rs1: int, rs2: int) -> int:
+    """Pack an R-type instruction"""
+    return 0x33 | (rd << 7) | (funct3 << 12) | \
+           (rs1 << 15) | (rs2 << 20) | (funct7 << 25)
+
+
+def _enc_itype(funct3: int, rd: int, rs1: int, imm: int) -> int:
+    """Pack an I-type instruction"""
+    return 0x13 | (rd << 7) | (funct3 << 12) | \
+           (rs1 << 15) | ((imm & 0xFFF) << 20)
+
 
 # ============================================================================
 # Assembly to Machine Code Converter
 # ============================================================================
 
 class RISCVAssembler:
-    """Simple RISC-V assembler for basic instructions"""
+    """
+    Simple RISC-V assembler for basic instructions
+    Holds no per-program state, so one instance can assemble any number
+    of programs
+    """
     
-    def __init__(self):
-        self.labels = {}
-        self.instructions = []
-        self.pc = 0
-        
     def assemble(self, assembly_code: str) -> List[int]:
         """Assemble RISC-V assembly to machine code"""
-        lines = assembly_code.strip().split('\n')
-        
-        # First pass: collect labels
-        current_pc = 0
-        for line in lines:
+        code_lines = []  # (pc, tokens) for instruction-bearing lines only
+        labels = {}
+
+        # Globals and bound methods used per line are held in locals so the
+        # loops below only do fast local loads
+        add_line = code_lines.append
+
+        # First pass: tokenize each line once, recording labels as the
+        # PC of the next instruction
+        for line in assembly_code.split('\n'):
+            line, _, _ = line.partition('#')
             line = line.strip()
-            if not line or line.startswith('#'):
+            if not line:
                 continue
             if ':' in line:
                 label = line.split(':')[0].strip()
-                self.labels[label] = current_pc
+                labels[label] = len(code_lines) * 4
                 continue
-            current_pc += 4
-        
-        # Second pass: generate machine code
-        current_pc = 0
+            add_line((len(code_lines) * 4, line.replace(',', ' ').split()))
+
+        # Second pass: generate machine code with every label known
         machine_code = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#') or ':' in line:
-                continue
-                
-            parts = line.replace(',', ' ').split()
-            opcode = parts[0].lower()
-            
+        emit = machine_code.append
+        lookup = _ENCODERS.get
+        encoders = self._FORMAT_ENCODERS
+        nop = _NOP
+
+        for pc, parts in code_lines:
             # Generate machine code based on instruction
-            if opcode in ['beq', 'bne', 'blt', 'bge']:
-                code = self._encode_branch(opcode, parts[1:], current_pc)
-            elif opcode in ['jal', 'jalr']:
-                code = self._encode_jump(opcode, parts[1:], current_pc)
-            elif opcode in ['add', 'sub', 'and', 'or', 'xor']:
-                code = self._encode_rtype(opcode, parts[1:])
-            elif opcode in ['addi', 'andi', 'ori', 'xori']:
-                code = self._encode_itype(opcode, parts[1:])
-            elif opcode == 'nop':
-                code = 0x00000013  # ADDI x0, x0, 0
+            spec = lookup(parts[0].lower())
+            if spec is None:
+                emit(nop)  # Default to NOP
+            elif spec[0] == 'CONST':
+                emit(spec[1])
             else:
-                code = 0x00000013  # Default to NOP
-                
-            machine_code.append(code)
-            current_pc += 4
-            
+                emit(encoders[spec[0]](self, spec[1], parts[1:], pc, labels))
+
         return machine_code
     
-    def _encode_branch(self, opcode: str, operands: List[str], pc: int) -> int:
-        """Encode branch instructions"""
+    def _encode_branch(self, fields: Tuple[int, ...], operands: List[str], pc: int,
+                      labels: Dict[str, int]) -> int:
+        """Encode branch instructions, fields = (funct3,)"""
+        funct3, = fields
         rs1 = self._parse_register(operands[0])
         rs2 = self._parse_register(operands[1])
         target = operands[2]
         
         # Calculate offset
-        if target in self.labels:
-            offset = self.labels[target] - pc
+        if target in labels:
+            offset = labels[target] - pc
         else:
             offset = int(target, 0)
-            
-        # Branch encoding
-        funct3_map = {'beq': 0b000, 'bne': 0b001, 'blt': 0b100, 'bge': 0b101}
-        funct3 = funct3_map.get(opcode, 0)
         
-        imm12 = offset & 0x1000
-        imm10_5 = (offset & 0x7E0) << 20
-        imm4_1 = (offset & 0x1E) << 7
-        imm11 = (offset & 0x800) >> 4
-        
-        return 0x63 | (funct3 << 12) | (rs1 << 15) | (rs2 << 20) | imm4_1 | imm11 | imm10_5 | imm12
+        return _enc_branch(funct3, rs1, rs2, offset)
     
-    def _encode_jump(self, opcode: str, operands: List[str], pc: int) -> int:
-        """Encode jump instructions"""
-        if opcode == 'jal':
+    def _encode_jump(self, fields: Tuple[int, ...], operands: List[str], pc: int,
+                    labels: Dict[str, int]) -> int:
+        """Encode jump instructions, fields = (base opcode,)"""
+        if fields[0] == 0x6F:  # jal
             rd = self._parse_register(operands[0])
             target = operands[1]
-            if target in self.labels:
-                offset = self.labels[target] - pc
+            if target in labels:
+                offset = labels[target] - pc
             else:
                 offset = int(target, 0)
-            return 0x6F | (rd << 7) | (offset & 0xFFFFF000)
+            return _enc_jal(rd, offset)
         else:  # jalr
             rd = self._parse_register(operands[0])
             rs1 = self._parse_register(operands[1])
             offset = int(operands[2], 0) if len(operands) > 2 else 0
-            return 0x67 | (rd << 7) | (0 << 12) | (rs1 << 15) | ((offset & 0xFFF) << 20)
+            return _enc_jalr(rd, rs1, offset)
     
-    def _encode_rtype(self, opcode: str, operands: List[str]) -> int:
-        """Encode R-type instructions"""
+    def _encode_rtype(self, fields: Tuple[int, ...], operands: List[str], pc: int,
+                     labels: Dict[str, int]) -> int:
+        """Encode R-type instructions, fields = (funct3, funct7)"""
+        funct3, funct7 = fields
         rd = self._parse_register(operands[0])
         rs1 = self._parse_register(operands[1])
         rs2 = self._parse_register(operands[2])
         
-        funct3_map = {'add': 0b000, 'sub': 0b000, 'and': 0b111, 
-                      'or': 0b110, 'xor': 0b100}
-        funct7_map = {'add': 0b0000000, 'sub': 0b0100000, 'and': 0b0000000,
-                      'or': 0b0000000, 'xor': 0b0000000}
-        
-        return 0x33 | (rd << 7) | (funct3_map[opcode] << 12) | \
-               (rs1 << 15) | (rs2 << 20) | (funct7_map[opcode] << 25)
+        return _enc_rtype(funct3, funct7, rd, rs1, rs2)
     
-    def _encode_itype(self, opcode: str, operands: List[str]) -> int:
-        """Encode I-type instructions"""
+    def _encode_itype(self, fields: Tuple[int, ...], operands: List[str], pc: int,
+                     labels: Dict[str, int]) -> int:
+        """Encode I-type instructions, fields = (funct3,)"""
+        funct3, = fields
         rd = self._parse_register(operands[0])
         rs1 = self._parse_register(operands[1])
         imm = int(operands[2], 0)
         
-        funct3_map = {'addi': 0b000, 'andi': 0b111, 'ori': 0b110, 'xori': 0b100}
-        
-        return 0x13 | (rd << 7) | (funct3_map[opcode] << 12) | \
-               (rs1 << 15) | ((imm & 0xFFF) << 20)
+        return _enc_itype(funct3, rd, rs1, imm)
     
     def _parse_register(self, reg: str) -> int:
         """Parse register name to number"""
-        reg = reg.lower().strip()
-        if reg.startswith('x'):
-            return int(reg[1:])
-        # Map common register names
-        reg_map = {
-            'zero': 0, 'ra': 1, 'sp': 2, 'gp': 3, 'tp': 4,
-            't0': 5, 't1': 6, 't2': 7, 's0': 8, 'fp': 8,
-            's1': 9, 'a0': 10, 'a1': 11, 'a2': 12, 'a3': 13,
-            'a4': 14, 'a5': 15, 'a6': 16, 'a7': 17,
-            's2': 18, 's3': 19, 's4': 20, 's5': 21,
-            's6': 22, 's7': 23, 's8': 24, 's9': 25,
-            's10': 26, 's11': 27, 't3': 28, 't4': 29,
-            't5': 30, 't6': 31
-        }
-        return reg_map.get(reg, 0)
+        try:
+            return _REG_MAP[reg]
+        except KeyError:
+            pass
+        # Slow path: mixed case or non-canonical xN names such as x05
+        name = reg.lower().strip()
+        if name in _REG_MAP:
+            return _REG_MAP[name]
+        if name.startswith('x'):
+            number = int(name[1:])
+            if not 0 <= number <= 31:
+                raise ValueError(f"Register out of range (x0-x31): {reg!r}")
+            return number
+        return 0
+
+    # Format -> encoder, shared by every instance and call
+    _FORMAT_ENCODERS = {'B': _encode_branch, 'J': _encode_jump,
+                        'R': _encode_rtype, 'I': _encode_itype}
 
 
 # ============================================================================
 # Trace to Ground Truth Converter
 # ============================================================================
 
+_READ_BUFFER = 1 << 20  # Bytes of stdio buffering for trace input
+_PARALLEL_MIN_BYTES = 4 << 20  # Smaller traces are not worth a process pool
+_TRACE_BATCH_BYTES = 1 << 20  # Bytes of trace parsed per batch
+_POOL_RANGE_MIN_BYTES = 1 << 20  # Smallest byte range handed to a pool worker
+
+
+def _parse_trace_lines(lines: List[str]) -> List[Tuple[int, bool, int]]:
+    """Parse `PC TAKEN TARGET` lines, skipping blanks and comments"""
+    branches = []
+    branches_append = branches.append
+    
+    for line in lines:
+        # split() drops surrounding whitespace, so blank lines and
+        # comments are caught by a length check and one character test
+        parts = line.split(None, 3)
+        if len(parts) < 3 or parts[0][0] == '#':
+            continue
+        branches_append((int(parts[0], 16), int(parts[1]) != 0,
+                         int(parts[2], 16)))
+    
+    return branches
+
+
+def _parse_trace_range(trace_file: str, start: int, end: int) -> List[Tuple[int, bool, int]]:
+    """
+    Parse the trace lines that begin inside the byte range [start, end)
+    Runs in a worker process; a line straddling `end` belongs to this range
+    """
+    with open(trace_file, 'rb', buffering=_READ_BUFFER) as f:
+        if start:
+            # Skip ahead to the first line starting at or after `start`
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        if pos >= end:
+            return []
+        data = f.read(end - pos)
+        if not data.endswith(b'\n'):
+            data += f.readline()
+    
+    return _parse_trace_lines(data.decode().splitlines())
+
+
 class BranchTraceParser:
     """Parse execution trace to extract branch behavior"""
     
-    def __init__(self):
-        self.branches = []
-    
-    def parse_trace(self, trace_file: str) -> List[Tuple[int, bool, int]]:
+    def parse_trace(self, trace_file: str, workers: int = 1,
+                    batch_size: int = _TRACE_BATCH_BYTES) -> Iterator[Tuple[int, bool, int]]:
         """
-        Parse trace file
+        Parse trace file, yielding (pc, taken, target) lazily
         Format: PC TAKEN TARGET
         Example:
             0x00000040 1 0x00000100
             0x00000080 0 0x00000084
-        """
-        branches = []
-        
-        with open(trace_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                    
-                parts = line.split()
-                if len(parts) >= 3:
-                    pc = int(parts[0], 16)
-                    taken = int(parts[1]) != 0
-                    target = int(parts[2], 16)
-                    branches.append((pc, taken, target))
         
-        return branches
+        The trace is consumed `batch_size` bytes at a time, so memory use is
+        bounded by the batch rather than the trace. With `workers` > 1, large
+        traces parse their batches in a process pool of that many processes;
+        the default of 1 keeps parsing in this process. Pool batches are never smaller than _POOL_RANGE_MIN_BYTES, since each
+        one costs a task that reopens the file and pickles its results back.
+        """
+        # Validate here rather than in the generator so a bad value fails
+        # at the call site, not on first iteration
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        return self._iter_trace(trace_file, workers, batch_size)
+    
+    def _iter_trace(self, trace_file: str, workers: int,
+                    batch_size: int) -> Iterator[Tuple[int, bool, int]]:
+        """Yield parsed trace entries batch by batch (see parse_trace)"""
+        size = os.path.getsize(trace_file)
+        
+        if size < _PARALLEL_MIN_BYTES or workers < 2:
+            with open(trace_file, 'r', buffering=_READ_BUFFER) as f:
+                while True:
+                    lines = f.readlines(batch_size)
+                    if not lines:
+                        break
+                    yield from _parse_trace_lines(lines)
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep at most one batch per worker in flight so finished
+            # batches never pile up ahead of the consumer
+            pending = deque()
+            span = max(batch_size, _POOL_RANGE_MIN_BYTES)
+            for start in range(0, size, span):
+                end = min(start + span, size)
+                pending.append(pool.submit(_parse_trace_range, trace_file, start, end))
+                if len(pending) > workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
     
     def generate_from_assembly(self, machine_code: List[int]) -> List[Tuple[int, bool, int]]:
         """
@@ -191,13 +317,14 @@ class BranchTraceParser:
         Simple static analysis
         """
         branches = []
-        pc = 0
-        
+        append = branches.append
+
         for i, inst in enumerate(machine_code):
             opcode = inst & 0x7F
-            
+
             # Branch instructions (opcode 0x63)
             if opcode == 0x63:
+                pc = i * 4
                 # Extract immediate
                 imm12 = (inst >> 31) & 0x1
                 imm10_5 = (inst >> 25) & 0x3F
@@ -205,31 +332,28 @@ class BranchTraceParser:
                 imm11 = (inst >> 7) & 0x1
                 
                 offset = (imm12 << 12) | (imm11 << 11) | (imm10_5 << 5) | (imm4_1 << 1)
-                if imm12:  # Sign extend
-                    offset |= 0xFFFFE000
+                offset = ((offset ^ 0x1000) - 0x1000) & 0xFFFFFFFF  # Sign extend bit 12
                 
                 target = (pc + offset) & 0xFFFFFFFF
                 
                 # For static analysis, assume branches alternate or follow pattern
                 # In real scenario, you'd run the program and trace actual behavior
                 taken = (i % 2 == 0)  # Simple pattern for demo
-                branches.append((pc, taken, target))
+                append((pc, taken, target))
             
             # JAL instruction (opcode 0x6F)
             elif opcode == 0x6F:
+                pc = i * 4
                 imm20 = (inst >> 31) & 0x1
                 imm10_1 = (inst >> 21) & 0x3FF
                 imm11 = (inst >> 20) & 0x1
                 imm19_12 = (inst >> 12) & 0xFF
                 
                 offset = (imm20 << 20) | (imm19_12 << 12) | (imm11 << 11) | (imm10_1 << 1)
-                if imm20:
-                    offset |= 0xFFE00000
+                offset = ((offset ^ 0x100000) - 0x100000) & 0xFFFFFFFF  # Sign extend bit 20
                 
                 target = (pc + offset) & 0xFFFFFFFF
-                branches.append((pc, True, target))  # JAL always taken
-            
-            pc += 4
+                append((pc, True, target))  # JAL always taken
         
         return branches
 
@@ -238,46 +362,80 @@ class BranchTraceParser:
 # Memory File Generator
 # ============================================================================
 
-def generate_program_mem(machine_code: List[int], output_file: str):
-    """Generate program.mem file for BRAM initialization"""
+_WRITE_BUFFER = 1 << 20  # Bytes of stdio buffering for .mem output
+_INVALID_ENTRY = "000000000000000000\n"
+
+
+def _write_mem(output_file: str, text: str, flush_per_entry: bool):
+    """
+    Write a formatted .mem file
+    `text` is always fully formatted before anything is written; this only
+    controls flush granularity. Bulk mode issues one buffered write, while
+    flush_per_entry writes and flushes the finished lines one at a time
+    """
+    if not flush_per_entry:
+        with open(output_file, 'w', buffering=_WRITE_BUFFER) as f:
+            f.write(text)
+        return
+    
     with open(output_file, 'w') as f:
-        for i, inst in enumerate(machine_code):
-            f.write(f"{inst:08X}\n")
+        for line in text.splitlines(keepends=True):
+            f.write(line)
+            f.flush()
+
+
+def generate_program_mem(machine_code: List[int], output_file: str,
+                         flush_per_entry: bool = False):
+    """Generate program.mem file for BRAM initialization"""
+    # Pack as big-endian words so the byte-level hex dump reads MSB first,
+    # with a newline after every 4 bytes
+    words = struct.pack(f'>{len(machine_code)}I', *machine_code).hex('\n', 4).upper()
+    _write_mem(output_file, words + '\n' if words else '', flush_per_entry)
     print(f"Generated {output_file} with {len(machine_code)} instructions")
 
 
-def generate_branch_mem(branches: List[Tuple[int, bool, int]], output_file: str):
+def generate_branch_mem(branches: Iterable[Tuple[int, bool, int]], output_file: str,
+                        flush_per_entry: bool = False):
     """
     Generate branches.mem file for ground truth
     Format: {valid[65], taken[64], pc[63:32], target[31:0]}
+    `branches` is consumed once, so a lazy trace stream works as input
     """
-    # Create lookup table indexed by PC[9:2]
+    # Create lookup table indexed by PC[9:2]; the last branch mapping to a
+    # slot wins, so only the surviving (at most 256) entries get packed
     branch_table = {}
+    count = 0
     
-    for pc, taken, target in branches:
-        index = (pc >> 2) & 0xFF  # Use PC[9:2] as index
-        # Pack: valid(1) | taken(1) | pc(32) | target(32) = 66 bits
-        valid = 1
-        entry = (valid << 65) | (int(taken) << 64) | (pc << 32) | target
-        branch_table[index] = entry
+    for count, branch in enumerate(branches, 1):
+        branch_table[(branch[0] >> 2) & 0xFF] = branch  # Use PC[9:2] as index
     
-    # Write to file
-    with open(output_file, 'w') as f:
-        for i in range(256):  # 256 entries
-            if i in branch_table:
-                entry = branch_table[i]
-                # Write as hex (66 bits = 17 hex digits, but we'll use 18 for alignment)
-                f.write(f"{entry:018X}\n")
-            else:
-                f.write("000000000000000000\n")  # Invalid entry
+    # Pack: valid(1) | taken(1) | pc(32) | target(32) = 66 bits
+    # Write as hex (66 bits = 17 hex digits, but we'll use 18 for alignment);
+    # slots without a branch hold an invalid entry
+    valid = 1
+    lines = {index: f"{(valid << 65) | (int(taken) << 64) | (pc << 32) | target:018X}\n"
+             for index, (pc, taken, target) in branch_table.items()}
+    _write_mem(output_file, ''.join([lines.get(i, _INVALID_ENTRY) for i in range(256)]),  # 256 entries
+               flush_per_entry)
     
-    print(f"Generated {output_file} with {len(branches)} branch entries")
+    print(f"Generated {output_file} with {count} branch entries")
 
 
 # ============================================================================
 # Main Program
 # ============================================================================
 
+def _positive_int(value: str) -> int:
+    """argparse type for options that must be a positive integer"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(description='Generate FPGA verification files')
     parser.add_argument('--assembly', '-a', type=str, help='Assembly file')
@@ -286,11 +444,20 @@ def main():
                        help='Output program memory file')
     parser.add_argument('--branch-out', '-b', default='branches.mem',
                        help='Output branch ground truth file')
+    parser.add_argument('--batch-size', type=_positive_int, default=_TRACE_BATCH_BYTES,
+                       help='Bytes of branch trace parsed per batch')
+    parser.add_argument('--workers', type=_positive_int, default=1,
+                       help='Processes used to parse large branch traces')
     parser.add_argument('--example', action='store_true',
                        help='Generate example files')
     
     args = parser.parse_args()
     
+    # Both tools are stateless between calls, so one instance of each serves
+    # every file below
+    assembler = RISCVAssembler()
+    trace_parser = BranchTraceParser()
+    
     if args.example:
         # Generate example files
         print("Generating example files...")
@@ -328,14 +495,12 @@ end:
         print("Generated example.asm")
         
         # Assemble
-        assembler = RISCVAssembler()
         machine_code = assembler.assemble(example_asm)
         
         # Generate program.mem
         generate_program_mem(machine_code, 'program.mem')
         
         # Generate branch trace (from static analysis)
-        trace_parser = BranchTraceParser()
         branches = trace_parser.generate_from_assembly(machine_code)
         
         # Generate branches.mem
@@ -354,18 +519,16 @@ end:
         with open(args.assembly, 'r') as f:
             assembly_code = f.read()
         
-        assembler = RISCVAssembler()
         machine_code = assembler.assemble(assembly_code)
         
         generate_program_mem(machine_code, args.program_out)
         
         if args.trace:
             # Use provided trace file
-            trace_parser = BranchTraceParser()
-            branches = trace_parser.parse_trace(args.trace)
+            branches = trace_parser.parse_trace(args.trace, workers=args.workers,
+                                                batch_size=args.batch_size)
         else:
             # Generate from static analysis
-            trace_parser = BranchTraceParser()
             branches = trace_parser.generate_from_assembly(machine_code)
         
         generate_branch_mem(branches, args.branch_out)